@@ -0,0 +1,57 @@
+"""Benchmarks for the client decode path in client_core.py (no GUI, no server).
+
+Run from the repository root:
+    python benchmarks/bench_client.py          # run and compare with benchmarks/baseline_client.json
+    python benchmarks/bench_client.py --save   # run and store the results as the new baseline
+"""
+import os
+
+from harness import BENCHMARKS_DIR, record_drawing, late_join_snapshot, measure, run_suite
+from protocol import encode_message, compress_frame
+from client_core import GameClient
+
+BASELINE_CLIENT_PATH = os.path.join(BENCHMARKS_DIR, 'baseline_client.json')
+RECV_SIZE = 4096 # Same chunk size GameClient.listen() reads with
+
+
+def chunks(stream):
+    return [stream[i:i + RECV_SIZE] for i in range(0, len(stream), RECV_SIZE)]
+
+
+def bench_feed(stream, messages, iterations):
+    """GameClient.feed() over a recorded byte stream, split the way recv() would deliver it."""
+    received = chunks(stream)
+    client = GameClient('guesser', '127.0.0.1', 0)
+
+    def decode():
+        client.reset()
+        for data in received:
+            client.feed(data)
+    result = measure(decode, iterations, ops_per_call=messages)
+    result['notes'] = f"ops = messages, {len(stream):,} B per run"
+    return result
+
+
+def drawing_stream(segments):
+    drawing = [cmd for cmd in record_drawing(segments) if cmd is not None][:segments]
+    return b''.join(encode_message('drawing_update', cmd) for cmd in drawing), len(drawing)
+
+
+def snapshot_stream(segments, compressed):
+    frame = encode_message('current_state', late_join_snapshot(record_drawing(segments)))
+    return (compress_frame(frame) if compressed else frame), 1
+
+
+BENCHMARKS = {
+    'feed/1000 drawing_update': lambda: bench_feed(*drawing_stream(1000), iterations=50),
+    'feed/current_state 10000 segments': lambda: bench_feed(*snapshot_stream(10000, False), iterations=30),
+    'feed/current_state 10000 segments, zlib': lambda: bench_feed(*snapshot_stream(10000, True), iterations=30),
+}
+
+
+def run(only):
+    return {name: bench() for name, bench in BENCHMARKS.items() if only in name}
+
+
+if __name__ == "__main__":
+    run_suite(__doc__.splitlines()[0], run, BASELINE_CLIENT_PATH)
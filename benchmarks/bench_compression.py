@@ -0,0 +1,49 @@
+"""Bytes saved vs. CPU time for compressing late-join snapshots.
+
+Run from the repository root:  python benchmarks/bench_compression.py
+"""
+import json
+import time
+import zlib
+import argparse
+
+from harness import record_drawing, late_join_snapshot
+from protocol import encode_message, compress_frame, decompress_message, COMPRESSION_LEVEL, COMPRESSION_DICT
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def deflated_size(frame, zdict=None):
+    """Size of the deflate stream alone, before base64 framing, with or without the shared dictionary."""
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS, **({'zdict': zdict} if zdict else {}))
+    return len(compressor.compress(frame.rstrip(b'\n')) + compressor.flush())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000, 20000],
+                        help="number of drawing segments per snapshot")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'segments':>9} {'raw B':>9} {'sent B':>9} {'saved':>7} {'dict B':>9} {'no-dict B':>10} "
+          f"{'compress ms':>12} {'decompress ms':>14}")
+    for size in args.sizes:
+        frame = encode_message('current_state', late_join_snapshot(record_drawing(size)))
+        compressed, compress_s = timed(lambda: compress_frame(frame), args.repeat)
+        sent = compressed or frame
+        decompress_s = 0.0
+        if compressed:
+            data = json.loads(compressed)['data']
+            _, decompress_s = timed(lambda: decompress_message(data), args.repeat)
+        saved = 1 - len(sent) / len(frame)
+        print(f"{size:>9} {len(frame):>9} {len(sent):>9} {saved:>6.1%} {deflated_size(frame, COMPRESSION_DICT):>9} "
+              f"{deflated_size(frame):>10} {compress_s * 1000:>12.3f} {decompress_s * 1000:>14.3f}")
+
+if __name__ == "__main__":
+    main()
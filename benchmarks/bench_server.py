@@ -0,0 +1,157 @@
+"""Benchmarks for the hot paths in server.py.
+
+Run from the repository root:
+    python benchmarks/bench_server.py             # run and compare with benchmarks/baseline.json
+    python benchmarks/bench_server.py --save      # run and store the results as the new baseline
+    python benchmarks/bench_server.py --only undo # run a subset
+"""
+import io
+import json
+import time
+import socket
+import threading
+import contextlib
+
+from harness import Drain, connect_fake_players, reset_server, record_drawing, measure, run_suite
+import server
+import hooks
+
+SEGMENT = [120, 80, 124, 83, 'black', 3]
+
+
+def bench_broadcast(drain, players, spectators=0, iterations=2000):
+    """broadcast() of one drawing segment until all N connected players have received it."""
+    reset_server(server)
+    connect_fake_players(server, drain, players)
+    for i in range(spectators):
+        server_end, client_end = socket.socketpair()
+        server.spectators[server_end] = (f"spectator{i}", ('socketpair', i))
+        drain.add(client_end)
+    frame_bytes = len(server.encode_message('drawing_update', SEGMENT)) * players
+    expected = [drain.bytes_received]
+
+    def clear_outbox():
+        with server.spectator_lock:
+            server.spectator_outbox.clear()
+
+    def broadcast_and_deliver(): # broadcast() only queues; the writer threads do the sending
+        expected[0] += frame_bytes
+        server.broadcast('drawing_update', SEGMENT)
+        while drain.bytes_received < expected[0]:
+            time.sleep(0)
+    result = measure(broadcast_and_deliver, iterations, setup=clear_outbox if spectators else None)
+    result['notes'] = "until every player received it" + (" (spectators are only queued)" if spectators else "")
+    return result
+
+
+def bench_handle_client_burst(drain, guessers=10, burst=100, iterations=200, drawing_hook=False):
+    """handle_client() parsing bursts of 'drawing_point' lines from the drawer and fanning them out."""
+    reset_server(server)
+    if drawing_hook:
+        hooks.on('drawing', len) # A no-op plugin; handlers run on the dispatcher thread anyway
+    connect_fake_players(server, drain, guessers)
+    server_end, drawer = socket.socketpair()
+    thread = threading.Thread(target=server.handle_client, args=(server_end, ('socketpair', 'drawer')), daemon=True)
+    thread.start()
+    drawer.sendall(server.encode_message('join', {'username': 'drawer'}))
+    while server_end not in server.clients:
+        time.sleep(0.001)
+    drain.add(drawer)
+    server.game_state.update({'status': 'playing', 'drawer': 'drawer', 'word': 'apple', 'round_start_time': time.time()})
+
+    lines = [json.dumps({'type': 'drawing_point', 'data': [x, 100, x + 1, 101, 'black', 3]}) for x in range(burst)]
+    payload = ('\n'.join(lines) + '\n' + json.dumps({'type': 'end_stroke', 'data': {}}) + '\n').encode('utf-8')
+    expected = [0]
+
+    def send_burst():
+        expected[0] += burst + 1
+        drawer.sendall(payload)
+        while len(server.game_state['drawing_data']) < expected[0]:
+            time.sleep(0)
+
+    result = measure(send_burst, iterations, ops_per_call=burst)
+    server.game_state.update({'status': 'waiting', 'drawer': None}) # So the disconnect doesn't end a round
+    drain.remove(drawer)
+    drawer.close()
+    thread.join(timeout=5)
+    if drawing_hook:
+        hooks.off('drawing', len)
+    result['notes'] = f"ops = segments, {burst}/burst, {guessers} guessers"
+    return result
+
+
+def bench_undo(drain, segments, players=10, iterations=200):
+    """undo_last_stroke() on a long drawing, including the 'full_drawing_update' broadcast."""
+    reset_server(server)
+    connect_fake_players(server, drain, players)
+    drawing = record_drawing(segments)
+
+    def restore_drawing():
+        server.game_state['drawing_data'] = list(drawing)
+    return measure(server.undo_last_stroke, iterations, setup=restore_drawing)
+
+
+def bench_current_state(drain, segments, compression=False, iterations=100):
+    """Building and sending the 'current_state' snapshot to a late joiner."""
+    reset_server(server)
+    connect_fake_players(server, drain, 1, compression=compression)
+    server_end = next(iter(server.clients))
+    server.game_state.update({'status': 'playing', 'drawer': 'player0', 'word': 'apple',
+                              'drawing_data': record_drawing(segments), 'round_start_time': time.time()})
+    result = measure(lambda: server.send_to_client(server_end, 'current_state', server.build_current_state('late')),
+                     iterations)
+    frame = server.encode_message('current_state', server.build_current_state('late'))
+    sent = (server.compress_frame(frame) or frame) if compression else frame
+    result['notes'] = f"{len(sent):,} B sent"
+    return result
+
+
+def bench_check_guess(correct, iterations=20000):
+    """check_guess() for a wrong or a correct guess."""
+    reset_server(server)
+    server.game_state.update({'status': 'playing', 'drawer': 'alice', 'word': 'ice cream',
+                              'score': {'alice': 0, 'bob': 0}, 'round_start_time': time.time()})
+    text = 'Ice Cream' if correct else 'ice scream'
+    calls = 100 # A single call is too fast to time on its own
+
+    def guess():
+        for _ in range(calls):
+            server.game_state['correct_guessers'].clear() # Otherwise bob's next correct guess scores nothing
+            server.check_guess('bob', text)
+    result = measure(guess, iterations // calls, ops_per_call=calls)
+    result['notes'] = f"latency per {calls} calls"
+    return result
+
+
+BENCHMARKS = {
+    'broadcast/1 player': lambda d: bench_broadcast(d, 1),
+    'broadcast/10 players': lambda d: bench_broadcast(d, 10),
+    'broadcast/100 players': lambda d: bench_broadcast(d, 100, iterations=500),
+    'broadcast/10 players + 100 spectators': lambda d: bench_broadcast(d, 10, spectators=100),
+    'handle_client/drawing burst': lambda d: bench_handle_client_burst(d),
+    'handle_client/drawing burst + hook': lambda d: bench_handle_client_burst(d, drawing_hook=True),
+    'undo/1000 segments': lambda d: bench_undo(d, 1000),
+    'undo/10000 segments': lambda d: bench_undo(d, 10000, iterations=50),
+    'current_state/1000 segments': lambda d: bench_current_state(d, 1000),
+    'current_state/10000 segments': lambda d: bench_current_state(d, 10000, iterations=30),
+    'current_state/10000 segments, zlib': lambda d: bench_current_state(d, 10000, compression=True, iterations=30),
+    'check_guess/wrong': lambda d: bench_check_guess(False),
+    'check_guess/correct': lambda d: bench_check_guess(True),
+}
+
+
+def run(only):
+    results = {}
+    drain = Drain()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()): # The server logs every connect/disconnect
+            for name, bench in BENCHMARKS.items():
+                if only in name:
+                    results[name] = bench(drain)
+    finally:
+        reset_server(server)
+        drain.stop()
+    return results
+
+if __name__ == "__main__":
+    run_suite(__doc__.splitlines()[0], run)
@@ -0,0 +1,230 @@
+"""Shared helpers for the benchmark scripts: timing, fake clients, recorded drawings and baselines."""
+import os
+import sys
+import json
+import argparse
+import time
+import random
+import socket
+import platform
+import selectors
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, 'baseline.json')
+COLORS = ["black", "red", "blue", "green", "orange", "purple", "brown", "white"]
+
+
+# --- Recorded Drawings ---
+def record_drawing(num_segments, seed=0):
+    """Simulates a drawer's strokes, producing drawing_data exactly as the server stores it."""
+    rng = random.Random(seed)
+    drawing_data = []
+    while len(drawing_data) < num_segments:
+        x, y = rng.randint(0, 600), rng.randint(0, 400)
+        color, pen_size = rng.choice(COLORS), rng.randint(1, 15)
+        drawing_data.append([x, y, x, y, color, pen_size])
+        for _ in range(rng.randint(5, 80)): # One stroke of <B1-Motion> segments
+            nx = min(600, max(0, x + rng.randint(-8, 8)))
+            ny = min(400, max(0, y + rng.randint(-8, 8)))
+            drawing_data.append([x, y, nx, ny, color, pen_size])
+            x, y = nx, ny
+        drawing_data.append(None)
+    return drawing_data
+
+
+def late_join_snapshot(drawing_data):
+    return {
+        'status': 'playing',
+        'drawer': 'alice',
+        'word': '????',
+        'word_length': 6,
+        'drawing_data': drawing_data,
+        'guesses': [['bob', 'house'], ['carol', 'tree'], ['HINT from alice', 'it grows']],
+        'score': {'alice': 12, 'bob': 27, 'carol': 0},
+        'current_round': 4,
+        'max_rounds': 9,
+    }
+
+
+# --- Fake Clients ---
+class Drain:
+    """Reads and discards everything sent to the client ends of socketpairs, like idle guessers would."""
+
+    def __init__(self):
+        self.selector = selectors.DefaultSelector()
+        self.bytes_received = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def add(self, sock):
+        sock.setblocking(False)
+        self.selector.register(sock, selectors.EVENT_READ)
+
+    def remove(self, sock):
+        try:
+            self.selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+
+    def run(self):
+        while self.running:
+            for key, _ in self.selector.select(timeout=0.05):
+                try:
+                    data = key.fileobj.recv(1 << 16)
+                except (BlockingIOError, InterruptedError):
+                    continue
+                except OSError:
+                    data = b''
+                if not data:
+                    self.remove(key.fileobj)
+                self.bytes_received += len(data)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.selector.close()
+
+
+def connect_fake_players(server, drain, count, compression=False):
+    """Registers `count` socketpair clients directly in server.clients. Returns the client-side sockets."""
+    peers = []
+    for i in range(count):
+        server_end, client_end = socket.socketpair()
+        username = f"player{i}"
+        server.clients[server_end] = (username, ('socketpair', i))
+        server.open_outbox(server_end)
+        server.game_state['score'][username] = 0
+        if compression:
+            server.compressed_clients.add(server_end)
+        drain.add(client_end)
+        peers.append(client_end)
+    return peers
+
+
+def reset_server(server):
+    """Disconnects every fake client and restores a fresh game_state without broadcasting."""
+    for sock in list(server.clients) + list(server.spectators) + list(server.pending_spectators):
+        server.close_outbox(sock)
+        try:
+            sock.close()
+        except OSError:
+            pass
+    server.clients.clear()
+    server.spectators.clear()
+    server.pending_spectators.clear()
+    server.compressed_clients.clear()
+    with server.spectator_lock:
+        server.spectator_outbox.clear()
+    server.game_state.update({
+        'status': 'waiting',
+        'drawer': None,
+        'word': None,
+        'drawing_data': [],
+        'guesses': [],
+        'score': {},
+        'players_ready': 0,
+        'current_round': 0,
+        'max_rounds': 0,
+        'round_start_time': 0,
+        'correct_guessers': [],
+        'player_order': [],
+        'current_drawer_index': -1,
+    })
+
+
+# --- Timing ---
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(func, iterations, ops_per_call=1, setup=None, warmup=10):
+    """Times `func` once per iteration. Returns ops/sec and latency percentiles in microseconds."""
+    for _ in range(warmup):
+        if setup: setup()
+        func()
+    latencies = []
+    total = 0.0
+    for _ in range(iterations):
+        if setup: setup()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        latencies.append(elapsed)
+        total += elapsed
+    latencies.sort()
+    return {
+        'ops_per_sec': (iterations * ops_per_call) / total if total else float('inf'),
+        'p50_us': percentile(latencies, 0.50) * 1e6,
+        'p95_us': percentile(latencies, 0.95) * 1e6,
+        'p99_us': percentile(latencies, 0.99) * 1e6,
+    }
+
+
+# --- Baselines ---
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    with open(path, 'w') as f:
+        json.dump({
+            'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'processor': platform.machine()},
+            'results': results,
+        }, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def print_results(results, baseline=None, threshold=0.25):
+    """Prints a results table. Returns the names of benchmarks whose median latency grew beyond `threshold` vs. the baseline.
+
+    The median is compared rather than ops/sec because a single stall (GC, scheduler) skews the mean.
+    """
+    regressions = []
+    print(f"{'benchmark':<40} {'ops/sec':>12} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'p50 vs base':>12}  notes")
+    for name, result in results.items():
+        change = ''
+        if baseline and name in baseline['results']:
+            delta = result['p50_us'] / baseline['results'][name]['p50_us'] - 1
+            change = f"{delta:+.1%}"
+            if delta > threshold:
+                change += ' !'
+                regressions.append(name)
+        notes = result.get('notes', '')
+        print(f"{name:<40} {result['ops_per_sec']:>12,.0f} {result['p50_us']:>10.1f} {result['p95_us']:>10.1f} "
+              f"{result['p99_us']:>10.1f} {change:>12}  {notes}")
+    return regressions
+
+
+def run_suite(description, run, baseline_path=BASELINE_PATH):
+    """Command line entry point shared by the benchmark scripts.
+
+    `run(only)` runs the benchmarks whose name contains `only` and returns {name: result}.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--save', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--only', default='', help="only run benchmarks whose name contains this text")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="median latency increase vs. baseline reported as a regression (default: 0.25)")
+    args = parser.parse_args()
+
+    results = run(args.only)
+
+    baseline = None if args.save else load_baseline(baseline_path)
+    regressions = print_results(results, baseline, args.threshold)
+    if args.save:
+        save_baseline(results, baseline_path)
+        print("Baseline saved.")
+    elif baseline is None:
+        print("No baseline found. Run with --save to create one.")
+    elif regressions:
+        print(f"\n{len(regressions)} benchmark(s) slowed down by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
@@ -0,0 +1,99 @@
+"""Load test: many headless bot clients in one process against a running server.
+
+All bots share a single selector loop and decode with client_core.GameClient, so
+thousands of them fit in one process. Start the server first, then for example:
+    python benchmarks/load_bots.py --bots 500
+    python benchmarks/load_bots.py --bots 2000 --spectate --prefix viewer
+"""
+import time
+import random
+import argparse
+import selectors
+
+import harness # noqa: F401 - puts the repository root on sys.path
+from client_core import GameClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--bots', type=int, default=100)
+    parser.add_argument('--prefix', default='bot', help="username prefix (bots are named <prefix>0, <prefix>1, ...)")
+    parser.add_argument('--spectate', action='store_true', help="join as spectators instead of players")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds to run")
+    parser.add_argument('--telemetry', action='store_true', help="stamp strokes and report their latency to the server")
+    parser.add_argument('--draw-rate', type=float, default=60.0, help="segments per second sent by a drawing bot")
+    args = parser.parse_args()
+
+    stats = {'messages': 0, 'bytes': 0}
+
+    def message_handler(bot):
+        def on_message(msg_type, msg_data, meta):
+            stats['messages'] += 1
+            if msg_type in ('drawing_update', 'drawing_batch', 'full_drawing_update'):
+                bot.stroke_rendered(meta)
+        return on_message
+
+    selector = selectors.DefaultSelector()
+    bots = []
+    for i in range(args.bots):
+        bot = GameClient(f"{args.prefix}{i}", args.host, args.port, spectator=args.spectate, telemetry=args.telemetry)
+        bot.on_message = message_handler(bot)
+        bot.connect()
+        selector.register(bot.sock, selectors.EVENT_READ, bot)
+        bots.append(bot)
+    print(f"Connected {len(bots)} bots.")
+
+    if not args.spectate:
+        for bot in bots:
+            bot.send_ready()
+
+    rng = random.Random(0)
+    pen = {}  # {bot: (x, y)} last point of the stroke being drawn
+    start = last_report = last_draw = time.perf_counter()
+    reported_messages = reported_bytes = 0
+    while time.perf_counter() - start < args.duration and selector.get_map():
+        for key, _ in selector.select(timeout=0.01):
+            bot = key.data
+            try:
+                data = bot.sock.recv(1 << 16)
+            except OSError:
+                data = b''
+            if not data:
+                selector.unregister(key.fileobj)
+                bot.close()
+                continue
+            stats['bytes'] += len(data)
+            bot.feed(data)
+
+        now = time.perf_counter()
+        if now - last_draw >= 1 / args.draw_rate:
+            last_draw = now
+            for bot in bots:
+                if bot.sock and bot.can_draw():
+                    x, y = pen.get(bot, (rng.randint(0, 600), rng.randint(0, 400)))
+                    nx, ny = min(600, max(0, x + rng.randint(-8, 8))), min(400, max(0, y + rng.randint(-8, 8)))
+                    bot.send_drawing_point([x, y, nx, ny, 'black', 3])
+                    pen[bot] = (nx, ny)
+
+        if now - last_report >= 1.0:
+            for bot in bots:
+                if bot.sock:
+                    bot.send_telemetry()
+            interval = now - last_report
+            print(f"{now - start:6.1f}s  {len(selector.get_map()):>6} bots connected  "
+                  f"{(stats['messages'] - reported_messages) / interval:>10,.0f} msg/s decoded  "
+                  f"{(stats['bytes'] - reported_bytes) / interval / 1024:>10,.1f} KiB/s received")
+            reported_messages, reported_bytes = stats['messages'], stats['bytes']
+            last_report = now
+
+    elapsed = time.perf_counter() - start
+    print(f"Decoded {stats['messages']:,} messages ({stats['bytes']:,} B) in {elapsed:.1f}s "
+          f"= {stats['messages'] / elapsed:,.0f} msg/s")
+    for bot in bots:
+        bot.close()
+
+
+if __name__ == "__main__":
+    main()
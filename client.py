@@ -1,34 +1,51 @@
-import socket
+import time
+START_TIME = time.perf_counter() # For --timing: measured before the heavier imports
+
 import threading
-import json
+import argparse
 import tkinter as tk
 from tkinter import simpledialog, messagebox
 import sys
+from client_core import GameClient
 
 HOST = '127.0.0.1'  # IMPORTANT: Use '127.0.0.1' for localhost, or the actual IP of the server machine
 PORT = 5555      # The port used by the server
 
 class PictionaryClient:
-    def __init__(self, master): # Initialize the client with the main window
+    def __init__(self, master, host=HOST, port=PORT, username=None, spectator=False, timing=False, telemetry=False): # Initialize the client with the main window
         self.master = master # Store the master window reference
+        self.host = host
+        self.port = port
+        self.spectator = spectator # Spectators only watch: no score, no drawing, no guessing
         master.title("Scribble") 
         master.geometry("1000x700")
 
-        self.username = None # Username for the player
-        self.sock = None
-        self.is_drawer = False
-        self.current_word = "????" # Actual word for drawer, '????' for guessers
-        self.current_word_length = None # Length for guessers
-        self.game_status = 'waiting' # 'waiting', 'playing', 'round_end', 'game_over'
-        self.current_round = 0
-        self.max_rounds = 0
+        self.username = username # Username for the player (asked for if not given on the command line)
+        self.connect_error = None # Set by the background connection thread if connecting fails
+
+        if not self.username:
+            self.ask_username() # Ask for username before connecting to the server
+
+        # Connection, game status and drawing model live in the UI-independent core;
+        # this class only renders them and turns Tk events into player actions.
+        self.core = GameClient(self.username, host, port, spectator=spectator, telemetry=telemetry,
+                               on_message=self.process_server_message, on_disconnect=self.on_disconnect)
 
-        self.drawing_history = [] # Stores drawing commands received
+        # Connect and send 'join' in the background while the GUI is being built
+        self.connect_thread = threading.Thread(target=self.connect_to_server, daemon=True)
+        self.connect_thread.start()
 
         # --- GUI Elements ---
         self.create_widgets() # Create the GUI elements
+        if self.spectator:
+            master.title("Scribble (Spectating)")
+            self.ready_button.pack_forget()
+            self.chat_entry.config(state=tk.DISABLED)
+            self.send_button.config(state=tk.DISABLED)
 
-        self.ask_username() # Ask for username before connecting to the server
+        if timing:
+            master.bind("<Map>", self.report_first_frame)
+        self.master.after(0, self.finish_connecting)
 
     def create_widgets(self):
         # Top Frame for Game Info
@@ -91,11 +108,24 @@ class PictionaryClient:
         self.send_button.pack(pady=2)
 
 
+        # Drawing tools are only built the first time this player becomes the drawer
+        self.right_panel = right_panel
+        self.tool_frame = None
+        self.color_var = tk.StringVar(value="black")
+        self.pen_size_var = tk.IntVar(value=3)
+
+        # Ready Button
+        self.ready_button = tk.Button(self.master, text="Ready to Play", command=self.send_ready)
+        self.ready_button.pack(pady=10)
+
+        # Store last drawing position
+        self.last_x = None
+        self.last_y = None
+
+    def create_tool_frame(self):
         # --- MODIFICATION: Drawing Tools now use the GRID layout manager ---
-        self.tool_frame = tk.Frame(right_panel, bd=1, relief="ridge")
-        self.tool_frame.pack(pady=10, padx=5, fill=tk.X)
+        self.tool_frame = tk.Frame(self.right_panel, bd=1, relief="ridge")
 
-        self.color_var = tk.StringVar(value="black")
         self.colors = ["black", "red", "blue", "green", "orange", "purple", "brown"]
         
         # Row 0: Color swatches
@@ -108,7 +138,6 @@ class PictionaryClient:
         self.eraser_button.grid(row=1, column=0, columnspan=len(self.colors), sticky="ew", padx=2, pady=3)
 
         # Row 2: Pen Size Slider. This should now be clearly visible.
-        self.pen_size_var = tk.IntVar(value=3)
         self.pen_size_label = tk.Label(self.tool_frame, text="Pen Size:")
         self.pen_size_label.grid(row=2, column=0, columnspan=2, sticky="w", padx=2)
         self.pen_size_slider = tk.Scale(self.tool_frame, from_=1, to=15, orient=tk.HORIZONTAL, variable=self.pen_size_var, showvalue=0)
@@ -124,90 +153,76 @@ class PictionaryClient:
         self.clear_button = tk.Button(button_frame, text="Clear Canvas", command=self.clear_my_canvas)
         self.clear_button.pack(side=tk.LEFT, padx=5)
 
-        self.tool_frame.pack_forget() # Hide by default
-
-        # Ready Button
-        self.ready_button = tk.Button(self.master, text="Ready to Play", command=self.send_ready)
-        self.ready_button.pack(pady=10)
+    def show_tools(self):
+        if self.tool_frame is None:
+            self.create_tool_frame()
+        self.tool_frame.pack(pady=10, padx=5, fill=tk.X)
 
-        # Store last drawing position
-        self.last_x = None
-        self.last_y = None
+    def hide_tools(self):
+        if self.tool_frame is not None:
+            self.tool_frame.pack_forget()
 
     def ask_username(self):
         self.username = simpledialog.askstring("Username", "Enter your username:", parent=self.master)
         if not self.username:
             self.master.destroy()
             sys.exit()
-        self.connect_to_server()
 
     def connect_to_server(self):
+        # Runs on a background thread, so it must not touch any Tk widgets
         try:
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.sock.connect((HOST, PORT))
-            self.add_to_notification(f"Connected to server at {HOST}:{PORT}")
-
-            join_message = json.dumps({'type': 'join', 'data': {'username': self.username}}) + '\n'
-            self.sock.sendall(join_message.encode('utf-8'))
-
-            threading.Thread(target=self.listen_for_messages, daemon=True).start()
-
+            self.core.connect()
         except ConnectionRefusedError:
-            messagebox.showerror("Connection Error", "Could not connect to the server. Is it running? Is the IP correct?")
-            self.master.destroy()
-            sys.exit()
+            self.connect_error = ("Connection Error", "Could not connect to the server. Is it running? Is the IP correct?")
         except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {e}")
+            self.connect_error = ("Error", f"An error occurred: {e}")
+
+    def finish_connecting(self):
+        # Polled from the Tk thread until the background connection attempt is done
+        if self.connect_thread.is_alive():
+            self.master.after(20, self.finish_connecting)
+            return
+        if self.connect_error:
+            messagebox.showerror(*self.connect_error)
             self.master.destroy()
             sys.exit()
-
-    def listen_for_messages(self):
-        buffer = ""
-        while True:
-            try:
-                data = self.sock.recv(4096).decode('utf-8')
-                if not data:
-                    break
-                buffer += data
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
-                    try:
-                        message = json.loads(line)
-                        self.process_server_message(message)
-                    except json.JSONDecodeError as e:
-                        print(f"JSON Decode Error: {e} - Data: {line}")
-                    except Exception as e:
-                        print(f"Error processing message: {e}")
-            except OSError as e:
-                print(f"Socket error or closed: {e}")
-                break
-            except Exception as e:
-                print(f"Unhandled error in listen_for_messages: {e}")
-                break
-        self.add_to_notification("Disconnected from server.")
-        if self.sock:
-            self.sock.close()
-            self.sock = None
-        if self.game_status != 'game_over':
+        self.add_to_notification(f"Connected to server at {self.host}:{self.port}")
+        self.core.start()
+        self.telemetry_tick()
+
+    def telemetry_tick(self):
+        self.guarded_send(self.core.send_telemetry)
+        if self.core.telemetry:
+            self.master.after(1000, self.telemetry_tick)
+
+    def report_first_frame(self, event):
+        self.master.unbind("<Map>")
+        print(f"Time to first frame: {(time.perf_counter() - START_TIME) * 1000:.1f} ms")
+
+    def process_server_message(self, msg_type, msg_data, meta):
+        # Called on the listener thread after the core has applied the message
+        self.master.after(0, lambda: self.update_gui(msg_type, msg_data, meta))
+
+    def on_disconnect(self):
+        self.master.after(0, lambda: self.add_to_notification("Disconnected from server."))
+        if self.core.game_status != 'game_over':
             self.master.after(0, lambda: messagebox.showinfo("Disconnected", "You have been disconnected from the server."))
             self.master.after(0, self.master.destroy)
             self.master.after(0, sys.exit)
 
-
-    def process_server_message(self, message):
-        msg_type = message.get('type')
-        msg_data = message.get('data')
-
-        self.master.after(0, lambda: self.update_gui(msg_type, msg_data))
-
-    def update_gui(self, msg_type, msg_data):
+    def update_gui(self, msg_type, msg_data, meta=None):
         if msg_type == 'drawing_update':
             self.draw_line_on_canvas(msg_data)
+            self.core.stroke_rendered(meta) # Stamped segments measure drawer-to-canvas latency
+        elif msg_type == 'drawing_batch': # Spectators, and players who fell behind, receive merged segments
+            for draw_cmd in msg_data['drawing_data']:
+                self.draw_line_on_canvas(draw_cmd)
+            self.core.stroke_rendered(meta)
         elif msg_type == 'full_drawing_update': 
             self.clear_canvas_gui()
-            self.drawing_history = [] 
             for draw_cmd in msg_data['drawing_data']:
                 self.draw_line_on_canvas(draw_cmd) 
+            self.core.stroke_rendered(meta) # Set when the snapshot replaced a lagging player's segments
         elif msg_type == 'chat_message':
             self.add_to_guess_chat(msg_data['username'], msg_data['message']) 
         elif msg_type == 'guess_hint_message': 
@@ -215,62 +230,50 @@ class PictionaryClient:
         elif msg_type == 'notification':
             self.add_to_notification(msg_data['message'])
         elif msg_type == 'new_round':
-            self.game_status = 'playing'
             self.drawer_label.config(text=f"Drawer: {msg_data['drawer']}")
-            self.is_drawer = (self.username == msg_data['drawer'])
-            self.current_round = msg_data['current_round']
-            self.max_rounds = msg_data['max_rounds']
-            self.round_label.config(text=f"Round: {self.current_round}/{self.max_rounds}")
+            is_drawer = (self.username == msg_data['drawer'])
+            self.round_label.config(text=f"Round: {msg_data['current_round']}/{msg_data['max_rounds']}")
             self.status_label.config(text="Status: Drawing")
             self.clear_canvas_gui()
-            self.drawing_history = []
             self.guess_chat_display.config(state=tk.NORMAL) 
             self.guess_chat_display.delete(1.0, tk.END)
             self.guess_chat_display.config(state=tk.DISABLED)
 
-            if self.is_drawer:
-                self.current_word = msg_data['word'] 
-                self.word_label.config(text=f"Word: {self.current_word}")
-                self.tool_frame.pack(pady=10, padx=5, fill=tk.X)
-                self.add_to_notification(f"You are drawing! Your word is: {self.current_word}")
+            if is_drawer:
+                self.word_label.config(text=f"Word: {msg_data['word']}")
+                self.show_tools()
+                self.add_to_notification(f"You are drawing! Your word is: {msg_data['word']}")
                 self.send_button.config(text="Send Hint/Chat") 
             else:
-                self.current_word = '????' 
-                self.current_word_length = msg_data['word_length']
-                if self.current_word_length is not None:
-                    self.word_label.config(text=f"Word: {'_ ' * self.current_word_length}") 
-                    self.add_to_notification(f"{msg_data['drawer']} is drawing. Guess the {self.current_word_length}-letter word!")
+                word_length = msg_data['word_length']
+                if word_length is not None:
+                    self.word_label.config(text=f"Word: {'_ ' * word_length}") 
+                    self.add_to_notification(f"{msg_data['drawer']} is drawing. Guess the {word_length}-letter word!")
                 else:
                     self.word_label.config(text=f"Word: ????")
                     self.add_to_notification(f"{msg_data['drawer']} is drawing. Guess the word!")
-                self.tool_frame.pack_forget()
+                self.hide_tools()
                 self.send_button.config(text="Send Guess/Chat") 
             self.ready_button.pack_forget()
 
         elif msg_type == 'round_end':
-            self.game_status = 'round_end'
             self.status_label.config(text="Status: Round Ended!")
             self.word_label.config(text=f"Word: {msg_data['correct_word']}") 
-            self.is_drawer = False
-            self.tool_frame.pack_forget()
+            self.hide_tools()
             self.clear_canvas_gui()
-            self.drawing_history = []
             self.send_button.config(text="Send Chat") 
 
             self.update_scores(msg_data['current_scores'])
             self.add_to_notification(msg_data['message'])
 
         elif msg_type == 'game_over':
-            self.game_status = 'game_over'
             self.status_label.config(text="Status: Game Over!")
             self.word_label.config(text="Word: N/A")
             self.drawer_label.config(text="Drawer: N/A")
             self.round_label.config(text="Round: N/A")
             self.timer_label.config(text="Time: --")
-            self.is_drawer = False
-            self.tool_frame.pack_forget()
+            self.hide_tools()
             self.clear_canvas_gui()
-            self.drawing_history = []
             self.send_button.config(text="Send Chat")
 
             self.update_scores(msg_data['final_scores'])
@@ -281,6 +284,10 @@ class PictionaryClient:
                 winner_score = msg_data['final_scores'].get(msg_data['winner'], 0)
                 winner_text = f"The winner is {msg_data['winner']} with a score of {winner_score}!"
             
+            if self.spectator:
+                messagebox.showinfo("Game Over!", f"Game Over!\n\nFinal Scores:\n{self.scoreboard.cget('text')}\n\n{winner_text}")
+                return
+
             response = messagebox.askquestion("Game Over!", f"Game Over!\n\nFinal Scores:\n{self.scoreboard.cget('text')}\n\n{winner_text}\n\nWould you like to play again?", type=messagebox.YESNO)
             if response == 'yes':
                 self.reset_game_state()
@@ -291,27 +298,23 @@ class PictionaryClient:
             self.ready_button.pack(pady=10) 
 
         elif msg_type == 'current_state':
-            self.game_status = msg_data['status']
             self.drawer_label.config(text=f"Drawer: {msg_data['drawer'] or 'N/A'}")
 
-            self.is_drawer = (self.username == msg_data['drawer']) 
-            if self.game_status == 'playing':
-                if self.is_drawer:
-                    self.current_word = msg_data['word']
-                    self.word_label.config(text=f"Word: {self.current_word}")
-                    self.tool_frame.pack(pady=10, padx=5, fill=tk.X)
+            if msg_data['status'] == 'playing':
+                if self.username == msg_data['drawer']:
+                    self.word_label.config(text=f"Word: {msg_data['word']}")
+                    self.show_tools()
                     self.send_button.config(text="Send Hint/Chat")
                 else:
-                    self.current_word_length = msg_data['word_length']
-                    if self.current_word_length is not None:
-                        self.word_label.config(text=f"Word: {'_ ' * self.current_word_length}") 
+                    if msg_data['word_length'] is not None:
+                        self.word_label.config(text=f"Word: {'_ ' * msg_data['word_length']}") 
                     else:
                         self.word_label.config(text="Word: ????")
-                    self.tool_frame.pack_forget()
+                    self.hide_tools()
                     self.send_button.config(text="Send Guess/Chat")
             else:
                 self.word_label.config(text="Word: ????")
-                self.tool_frame.pack_forget()
+                self.hide_tools()
                 self.send_button.config(text="Send Chat")
 
 
@@ -321,8 +324,11 @@ class PictionaryClient:
                 self.draw_line_on_canvas(draw_cmd)
             for username, text in msg_data['guesses']: 
                 self.add_to_guess_chat(username, text)
-            self.add_to_notification("Welcome to Scribble! Click 'Ready to Play' to start.")
-            if self.game_status == 'waiting' and all(score == 0 for score in msg_data['score'].values()):
+            if self.spectator:
+                self.add_to_notification("Welcome to Scribble! You are spectating.")
+            else:
+                self.add_to_notification("Welcome to Scribble! Click 'Ready to Play' to start.")
+            if not self.spectator and msg_data['status'] == 'waiting' and all(score == 0 for score in msg_data['score'].values()):
                 self.ready_button.config(state=tk.NORMAL, text="Ready to Play")
 
 
@@ -331,7 +337,6 @@ class PictionaryClient:
 
         elif msg_type == 'clear_canvas_event':
             self.clear_canvas_gui()
-            self.drawing_history = []
         elif msg_type == 'timer_update':
             self.timer_label.config(text=f"Time: {msg_data['time_left']}s")
         elif msg_type == 'error':
@@ -339,7 +344,7 @@ class PictionaryClient:
             if msg_data['message'] == "Username already taken.":
                 self.master.destroy()
                 root = tk.Tk()
-                client = PictionaryClient(root)
+                client = PictionaryClient(root, host=self.host, port=self.port, spectator=self.spectator)
                 root.mainloop()
 
     def add_to_notification(self, message):
@@ -363,17 +368,17 @@ class PictionaryClient:
 
     # --- Drawing Logic ---
     def start_draw(self, event):
-        if self.is_drawer and self.game_status == 'playing':
+        if self.core.can_draw():
             self.last_x, self.last_y = event.x, event.y
             x, y = event.x, event.y
             color = self.color_var.get()
             pen_size = self.pen_size_var.get()
             self.canvas.create_line((x, y, x, y), fill=color, width=pen_size, capstyle=tk.ROUND)
             draw_cmd = (x, y, x, y, color, pen_size)
-            self.send_message('drawing_point', draw_cmd)
+            self.guarded_send(self.core.send_drawing_point, draw_cmd)
 
     def draw(self, event):
-        if self.is_drawer and self.game_status == 'playing':
+        if self.core.can_draw():
             x, y = event.x, event.y
             color = self.color_var.get()
             pen_size = self.pen_size_var.get()
@@ -381,14 +386,14 @@ class PictionaryClient:
             if self.last_x is not None and self.last_y is not None:
                 self.canvas.create_line((self.last_x, self.last_y, x, y), fill=color, width=pen_size, capstyle=tk.ROUND, smooth=tk.TRUE)
                 draw_cmd = (self.last_x, self.last_y, x, y, color, pen_size)
-                self.send_message('drawing_point', draw_cmd)
+                self.guarded_send(self.core.send_drawing_point, draw_cmd)
             
             self.last_x, self.last_y = x, y
 
     def end_draw(self, event):
         self.last_x = None
         self.last_y = None
-        if self.is_drawer and self.game_status == 'playing':
+        if self.core.can_draw():
             self.send_message('end_stroke', {})
 
     def draw_line_on_canvas(self, draw_cmd):
@@ -398,7 +403,6 @@ class PictionaryClient:
         if len(draw_cmd) == 6:
             x1, y1, x2, y2, color, pen_size = draw_cmd
             self.canvas.create_line((x1, y1, x2, y2), fill=color, width=pen_size, capstyle=tk.ROUND, smooth=tk.TRUE)
-            self.drawing_history.append(draw_cmd)
         else:
             print(f"Unknown drawing command format received: {draw_cmd}")
 
@@ -407,11 +411,11 @@ class PictionaryClient:
         self.canvas.delete("all")
 
     def clear_my_canvas(self):
-        if self.is_drawer and self.game_status == 'playing':
+        if self.core.can_draw():
             self.send_message('clear_canvas', {})
 
     def send_undo_request(self):
-        if self.is_drawer and self.game_status == 'playing':
+        if self.core.can_draw():
             self.send_message('undo_last_draw', {})
         else:
             self.add_to_notification("You can only undo if you are the drawer.")
@@ -427,25 +431,25 @@ class PictionaryClient:
         self.send_message('chat_input', {'text': text})
 
     def send_message(self, message_type, data):
-        if self.sock:
-            try:
-                full_message = json.dumps({'type': message_type, 'data': data}) + '\n'
-                self.sock.sendall(full_message.encode('utf-8'))
-            except OSError as e:
-                print(f"Error sending message (socket might be closed): {e}")
-                self.master.after(0, lambda: messagebox.showerror("Connection Error", "Lost connection to server."))
-                self.master.after(0, self.master.destroy)
-                self.master.after(0, sys.exit)
-            except Exception as e:
-                print(f"Error sending message: {e}")
+        self.guarded_send(self.core.send_message, message_type, data)
+
+    def guarded_send(self, send, *args):
+        # Runs one of the core's send methods, treating a dead socket as a lost connection
+        try:
+            return send(*args)
+        except OSError as e:
+            print(f"Error sending message (socket might be closed): {e}")
+            self.master.after(0, lambda: messagebox.showerror("Connection Error", "Lost connection to server."))
+            self.master.after(0, self.master.destroy)
+            self.master.after(0, sys.exit)
+        except Exception as e:
+            print(f"Error sending message: {e}")
+        return False
 
     def send_ready(self):
-        if self.game_status == 'waiting' or self.game_status == 'game_over':
-            self.send_message('ready', {})
+        if self.guarded_send(self.core.send_ready):
             self.ready_button.config(state=tk.DISABLED, text="Waiting for others...")
-            self.game_status = 'waiting'
             self.clear_canvas_gui()
-            self.drawing_history = []
             self.guess_chat_display.config(state=tk.NORMAL)
             self.guess_chat_display.delete(1.0, tk.END)
             self.guess_chat_display.config(state=tk.DISABLED)
@@ -461,13 +465,7 @@ class PictionaryClient:
 
 
     def reset_game_state(self):
-        self.is_drawer = False
-        self.current_word = "????"
-        self.current_word_length = None
-        self.game_status = 'waiting'
-        self.current_round = 0
-        self.max_rounds = 0
-        self.drawing_history = []
+        self.core.reset()
 
         self.clear_canvas_gui()
         self.guess_chat_display.config(state=tk.NORMAL)
@@ -484,26 +482,32 @@ class PictionaryClient:
         self.timer_label.config(text="Time: --")
         self.update_scores({})
 
-        self.tool_frame.pack_forget()
+        self.hide_tools()
         self.send_button.config(text="Send Chat")
         self.ready_button.config(state=tk.NORMAL, text="Ready to Play")
 
 
     def on_closing(self):
         if messagebox.askokcancel("Quit", "Do you want to quit the game?"):
-            if self.sock:
+            if self.core.sock:
                 print("Closing socket...")
-                try:
-                    self.sock.shutdown(socket.SHUT_RDWR)
-                    self.sock.close()
-                except OSError as e:
-                    print(f"Error during socket shutdown/close: {e}")
+                self.core.close()
             self.master.destroy()
             sys.exit()
 
 # Main execution
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scribble client")
+    parser.add_argument('--host', default=HOST, help=f"server address (default: {HOST})")
+    parser.add_argument('--port', type=int, default=PORT, help=f"server port (default: {PORT})")
+    parser.add_argument('--username', help="skip the username dialog")
+    parser.add_argument('--spectate', action='store_true', help="watch the game without playing")
+    parser.add_argument('--timing', action='store_true', help="print the time to the first frame")
+    parser.add_argument('--telemetry', action='store_true', help="measure stroke latency and report it to the server")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    client = PictionaryClient(root)
+    client = PictionaryClient(root, host=args.host, port=args.port, username=args.username,
+                              spectator=args.spectate, timing=args.timing, telemetry=args.telemetry)
     root.protocol("WM_DELETE_WINDOW", client.on_closing)
     root.mainloop()
\ No newline at end of file
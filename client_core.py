@@ -0,0 +1,256 @@
+import socket
+import threading
+import json
+import time
+from collections import deque
+from protocol import encode_message, decompress_message, COMPRESSION_CODEC
+
+PING_INTERVAL = 5.0            # Seconds between clock offset pings
+LATENCY_REPORT_INTERVAL = 10.0 # Seconds between stroke latency reports to the server
+MAX_LATENCY_SAMPLES = 500      # Samples kept between reports
+
+class GameClient:
+    """The UI-independent part of the Scribble client: connection, framing, game status and drawing model.
+
+    Every decoded server message first updates the state below and is then passed to
+    on_message(msg_type, msg_data, meta). When the connection ends, on_disconnect() is called.
+    Both callbacks run on the listener thread (or whichever thread calls feed()), so a GUI
+    must hand them over to its own thread.
+
+    With telemetry enabled, the drawer stamps each segment with a sequence id and a timestamp
+    in server time, and guessers report how long segments took to reach their canvas.
+    """
+
+    def __init__(self, username, host, port, spectator=False, on_message=None, on_disconnect=None, telemetry=False):
+        self.username = username
+        self.host = host
+        self.port = port
+        self.spectator = spectator # Spectators only watch: no score, no drawing, no guessing
+        self.on_message = on_message
+        self.on_disconnect = on_disconnect
+
+        self.sock = None
+        self.buffer = b""
+
+        # --- Latency Telemetry ---
+        self.telemetry = telemetry
+        self.clock_offset = 0.0 # Server clock minus local clock, in seconds
+        self.pongs = deque(maxlen=8) # Recent (round_trip, offset) samples
+        self.stroke_seq = 0
+        self.last_seq_seen = None
+        self.latency_samples = deque(maxlen=MAX_LATENCY_SAMPLES) # Stroke latencies in ms
+        self.missing_segments = 0
+        self.last_ping = self.last_latency_report = 0.0
+
+        self.reset()
+
+    def reset(self):
+        """Forgets everything about the current game (used when starting over)."""
+        self.game_status = 'waiting' # 'waiting', 'playing', 'round_end', 'game_over'
+        self.drawer = None
+        self.is_drawer = False
+        self.current_word = "????" # Actual word for drawer, '????' for guessers
+        self.current_word_length = None # Length for guessers
+        self.current_round = 0
+        self.max_rounds = 0
+        self.time_left = None
+        self.scores = {}
+        self.drawing_history = [] # (x1, y1, x2, y2, color, pen_size) segments currently on the canvas
+
+    # --- Connection ---
+    def connect(self):
+        """Connects and sends 'join'. Raises OSError (e.g. ConnectionRefusedError) on failure."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.connect((self.host, self.port))
+            sock.sendall(encode_message('join', {'username': self.username, 'spectator': self.spectator,
+                                                 'compression': [COMPRESSION_CODEC]}))
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+    def start(self):
+        """Starts listening for server messages on a daemon thread."""
+        threading.Thread(target=self.listen, daemon=True).start()
+
+    def listen(self):
+        while True:
+            try:
+                data = self.sock.recv(4096)
+                if not data:
+                    break
+                self.feed(data)
+            except OSError as e:
+                print(f"Socket error or closed: {e}")
+                break
+            except Exception as e:
+                print(f"Unhandled error in listen: {e}")
+                break
+        self.close()
+        if self.on_disconnect:
+            self.on_disconnect()
+
+    def close(self):
+        sock, self.sock = self.sock, None # The listener thread closes too when the connection drops
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+    def send_message(self, message_type, data, meta=None):
+        """Sends a message to the server. Raises OSError if the connection is gone."""
+        if self.sock:
+            self.sock.sendall(encode_message(message_type, data, meta))
+
+    # --- Framing ---
+    def feed(self, data):
+        """Decodes received bytes, applying and dispatching every complete message."""
+        self.buffer += data
+        while b'\n' in self.buffer:
+            line, self.buffer = self.buffer.split(b'\n', 1)
+            if not line: continue
+            try:
+                message = json.loads(line)
+                if message.get('type') == 'compressed':
+                    message = decompress_message(message['data'])
+                msg_type = message.get('type')
+                msg_data = message.get('data')
+                meta = message.get('meta')
+                self.apply_message(msg_type, msg_data)
+                if self.on_message:
+                    self.on_message(msg_type, msg_data, meta)
+            except json.JSONDecodeError as e:
+                print(f"JSON Decode Error: {e} - Data: {line}")
+            except Exception as e:
+                print(f"Error processing message: {e}")
+
+    # --- Game State ---
+    def apply_message(self, msg_type, msg_data):
+        """Updates the game status and drawing model for one server message."""
+        if msg_type == 'drawing_update':
+            self.add_segment(msg_data)
+        elif msg_type == 'drawing_batch':
+            for draw_cmd in msg_data['drawing_data']:
+                self.add_segment(draw_cmd)
+        elif msg_type == 'full_drawing_update':
+            self.drawing_history = []
+            for draw_cmd in msg_data['drawing_data']:
+                self.add_segment(draw_cmd)
+        elif msg_type == 'clear_canvas_event':
+            self.drawing_history = []
+        elif msg_type == 'new_round':
+            self.game_status = 'playing'
+            self.last_seq_seen = None # New drawer, new sequence
+            self.drawer = msg_data['drawer']
+            self.is_drawer = (self.username == msg_data['drawer'])
+            self.current_round = msg_data['current_round']
+            self.max_rounds = msg_data['max_rounds']
+            self.current_word = msg_data['word'] if self.is_drawer else '????'
+            self.current_word_length = None if self.is_drawer else msg_data['word_length']
+            self.drawing_history = []
+        elif msg_type == 'round_end':
+            self.game_status = 'round_end'
+            self.is_drawer = False
+            self.current_word = msg_data['correct_word']
+            self.scores = msg_data['current_scores']
+            self.drawing_history = []
+        elif msg_type == 'game_over':
+            self.game_status = 'game_over'
+            self.drawer = None
+            self.is_drawer = False
+            self.time_left = None
+            self.scores = msg_data['final_scores']
+            self.drawing_history = []
+        elif msg_type == 'current_state':
+            self.game_status = msg_data['status']
+            self.drawer = msg_data['drawer']
+            self.is_drawer = (self.username == msg_data['drawer'])
+            self.current_word = msg_data['word'] if self.is_drawer else '????'
+            self.current_word_length = msg_data['word_length']
+            self.current_round = msg_data['current_round']
+            self.max_rounds = msg_data['max_rounds']
+            self.scores = msg_data['score']
+            self.drawing_history = []
+            for draw_cmd in msg_data['drawing_data']:
+                self.add_segment(draw_cmd)
+        elif msg_type == 'player_list_update':
+            self.scores = msg_data['scores']
+        elif msg_type == 'timer_update':
+            self.time_left = msg_data['time_left']
+        elif msg_type == 'pong':
+            self.apply_pong(msg_data)
+
+    def add_segment(self, draw_cmd):
+        """Records a drawing segment. Stroke separators (None) and malformed commands are skipped."""
+        if draw_cmd is not None and len(draw_cmd) == 6:
+            self.drawing_history.append(draw_cmd)
+
+    # --- Player Actions ---
+    def can_draw(self):
+        return self.is_drawer and self.game_status == 'playing'
+
+    def send_drawing_point(self, draw_cmd):
+        """Sends one drawing segment, stamped with a sequence id and server-time timestamp if telemetry is on."""
+        meta = None
+        if self.telemetry:
+            self.stroke_seq += 1
+            meta = {'seq': self.stroke_seq, 'ts': self.server_time()}
+        self.send_message('drawing_point', draw_cmd, meta)
+
+    def send_ready(self):
+        """Signals readiness. Returns False if the game is already running."""
+        if self.game_status not in ('waiting', 'game_over'):
+            return False
+        self.send_message('ready', {})
+        self.game_status = 'waiting'
+        self.drawing_history = []
+        self.scores = {}
+        return True
+
+    # --- Latency Telemetry ---
+    def server_time(self):
+        return time.time() + self.clock_offset
+
+    def apply_pong(self, msg_data):
+        """Updates the clock offset estimate, trusting the sample with the shortest round trip (like NTP)."""
+        received = time.time()
+        round_trip = received - msg_data['t0']
+        self.pongs.append((round_trip, msg_data['t1'] - (msg_data['t0'] + received) / 2))
+        self.clock_offset = min(self.pongs)[1]
+
+    def stroke_rendered(self, meta):
+        """Records the delay of a stamped segment that just reached the canvas.
+
+        Batches and snapshots that replace several stamped segments carry the newest one's 'seq' and 'ts',
+        and 'first_seq' so the merged segments in between are not counted as missing.
+        """
+        if not meta or 'ts' not in meta:
+            return
+        self.latency_samples.append((self.server_time() - meta['ts']) * 1000)
+        seq = meta.get('seq')
+        if seq is not None:
+            first_seq = meta.get('first_seq', seq)
+            if self.last_seq_seen is not None and first_seq > self.last_seq_seen + 1:
+                self.missing_segments += first_seq - self.last_seq_seen - 1
+            self.last_seq_seen = max(seq, self.last_seq_seen or 0)
+
+    def send_telemetry(self):
+        """Sends a ping and/or latency report when they are due. Call this periodically (e.g. once a second)."""
+        if not self.telemetry or not self.sock:
+            return
+        now = time.time()
+        if now - self.last_ping >= PING_INTERVAL:
+            self.last_ping = now
+            self.send_message('ping', {'t0': now})
+        if now - self.last_latency_report >= LATENCY_REPORT_INTERVAL:
+            self.last_latency_report = now
+            if self.latency_samples or self.missing_segments:
+                self.send_message('latency_report', {
+                    'samples_ms': [round(sample, 2) for sample in self.latency_samples],
+                    'missing_segments': self.missing_segments,
+                })
+                self.latency_samples.clear()
+                self.missing_segments = 0
@@ -0,0 +1,101 @@
+import os
+import sys
+import queue
+import importlib
+import threading
+import time
+
+# --- Game Event Hooks ---
+# Plugins (analytics, anti-cheat, persistence, ...) subscribe to game events with on().
+# Handlers run on one dispatcher thread, never on the game loop, so a slow plugin cannot
+# delay a broadcast. High-frequency events are collected and delivered as a list every
+# BATCH_INTERVAL. Until the first handler is registered, emit() returns right away.
+EVENTS = ('join', 'leave', 'round_start', 'correct_guess', 'round_end', 'game_end', 'drawing')
+BATCHED_EVENTS = ('drawing',)
+BATCH_INTERVAL = 0.5  # Seconds between deliveries of batched events
+QUEUE_LIMIT = 10000   # Events waiting for the dispatcher before new ones are dropped
+
+handlers = {}  # {event: [handler, ...]} - only events somebody listens to
+pending = queue.Queue(maxsize=QUEUE_LIMIT)  # (event, data) waiting for the dispatcher
+dropped = 0
+dispatcher = None
+dispatcher_lock = threading.Lock()
+
+
+def on(event, handler):
+    """Registers `handler(data)` for a game event. Batched events pass a list of data dicts instead."""
+    global dispatcher
+    if event not in EVENTS:
+        raise ValueError(f"Unknown game event: {event}")
+    with dispatcher_lock:
+        handlers.setdefault(event, []).append(handler)
+        if dispatcher is None:
+            dispatcher = threading.Thread(target=dispatch_loop, daemon=True)
+            dispatcher.start()
+
+
+def off(event, handler):
+    """Unregisters a handler. Once an event has no handlers left, emitting it is free again."""
+    with dispatcher_lock:
+        registered = handlers.get(event, [])
+        if handler in registered:
+            registered.remove(handler)
+        if not registered:
+            handlers.pop(event, None)
+
+
+def emit(event, data):
+    """Queues an event for its handlers. Never blocks; a no-op if nobody listens to `event`."""
+    global dropped
+    if event not in handlers:
+        return
+    try:
+        pending.put_nowait((event, data))
+    except queue.Full:
+        dropped += 1
+        if dropped % 1000 == 1:
+            print(f"Hook handlers are falling behind. Dropped {dropped} events so far.")
+
+
+def call_handlers(event, data):
+    for handler in list(handlers.get(event, [])):
+        try:
+            handler(data)
+        except Exception as e:
+            print(f"Error in {event} hook {getattr(handler, '__name__', handler)}: {e}")
+
+
+def dispatch_loop():
+    """Runs the handlers of queued events, delivering batched events together."""
+    batches = {}  # {event: [data, ...]}
+    next_flush = time.time() + BATCH_INTERVAL
+    while True:
+        try:
+            event, data = pending.get(timeout=max(0, next_flush - time.time()))
+            if event in BATCHED_EVENTS:
+                batches.setdefault(event, []).append(data)
+            else:
+                # Deliver what was batched so far first, so handlers see events in order
+                for batched_event, items in batches.items():
+                    call_handlers(batched_event, items)
+                batches = {}
+                call_handlers(event, data)
+        except queue.Empty:
+            pass
+        if time.time() >= next_flush:
+            for batched_event, items in batches.items():
+                call_handlers(batched_event, items)
+            batches = {}
+            next_flush = time.time() + BATCH_INTERVAL
+
+
+def load_plugins(module_names):
+    """Imports plugin modules, which register their handlers with on() when imported.
+
+    Modules are looked up on sys.path and in the current directory. Errors raised while importing propagate.
+    """
+    if module_names and os.getcwd() not in sys.path:
+        sys.path.append(os.getcwd())
+    for name in module_names:
+        importlib.import_module(name)
+        print(f"Loaded plugin {name}.")
@@ -0,0 +1,61 @@
+import zlib
+import json
+import base64
+
+# --- Message Compression ---
+# Large snapshot messages ('current_state', 'full_drawing_update') carry whole drawing
+# histories and compress very well. Clients opt in at 'join'; only frames above the
+# threshold are compressed so the small hot-path messages are sent unchanged.
+COMPRESSION_CODEC = 'zlib'
+COMPRESSION_THRESHOLD = 1024  # Bytes of raw JSON before a frame is worth compressing
+COMPRESSION_LEVEL = 6
+
+# Preset dictionary shared by server and client. zlib favours matches near the end of
+# the dictionary, so the most common fragments of drawing data are listed last.
+COMPRESSION_DICT = (
+    '{"type": "current_state", "data": {"status": "waiting", "drawer": null, "word": "????", '
+    '"word_length": null, "guesses": [["HINT from ", ""]], "score": {}, "current_round": 0, '
+    '"max_rounds": 0, "status": "playing", "round_end", "game_over", '
+    '{"type": "full_drawing_update", "data": {"drawing_data": [[, null, '
+    '"purple", 1], "brown", 2], "orange", 4], "green", 5], "blue", 6], "white", 15], '
+    '"red", 3], "black", 3], [1, [2, [3, [4, [5, [6, [7, [8, [9, '
+    ', 10, , 20, , 30, , 40, , 50, , 60, , 70, , 80, , 90, , 100, , 200, , 300, '
+    '"black", 3], null, [[1'
+).encode('utf-8')
+
+
+def encode_message(message_type, data, meta=None):
+    """Serializes a message into a newline-terminated JSON frame.
+
+    `meta` carries optional telemetry (e.g. stroke sequence ids and timestamps) next to the data.
+    """
+    message = {'type': message_type, 'data': data}
+    if meta is not None:
+        message['meta'] = meta
+    return (json.dumps(message) + '\n').encode('utf-8')
+
+
+def compress_frame(frame, threshold=COMPRESSION_THRESHOLD):
+    """Wraps an encoded frame in a 'compressed' message.
+
+    Returns None if the frame is too small to bother, or if the wrapped frame (base64 adds a third)
+    would not be smaller than the original.
+    """
+    if len(frame) < threshold:
+        return None
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS, zdict=COMPRESSION_DICT)
+    payload = compressor.compress(frame.rstrip(b'\n')) + compressor.flush()
+    compressed = encode_message('compressed', {
+        'codec': COMPRESSION_CODEC,
+        'payload': base64.b64encode(payload).decode('ascii'),
+    })
+    return compressed if len(compressed) < len(frame) else None
+
+
+def decompress_message(data):
+    """Restores the original message dict from the data of a 'compressed' message."""
+    if data.get('codec') != COMPRESSION_CODEC:
+        raise ValueError(f"Unsupported compression codec: {data.get('codec')}")
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS, zdict=COMPRESSION_DICT)
+    raw = decompressor.decompress(base64.b64decode(data['payload'])) + decompressor.flush()
+    return json.loads(raw.decode('utf-8'))
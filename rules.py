@@ -0,0 +1,75 @@
+import os
+import json
+import math
+
+# --- Game Rules ---
+# A rule profile decides how long rounds last, how many there are and how guesses are scored.
+# Profiles live in a JSON file ({profile name: {rule: value}}); rules a profile leaves out
+# keep their default. The defaults are the classic game: the first correct guess ends the round.
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules.json')
+DEFAULT_PROFILE = 'classic'
+DEFAULT_RULES = {
+    'min_players': 2,           # Players needed to start and to keep a game going
+    'round_time': 90,           # Seconds per round
+    'intermission': 5,          # Seconds between the end of a round and the next one
+    'rounds_per_player': 3,     # The game lasts this many rounds per player
+    'guessers_per_round': 1,    # Correct guesses that end a round (0: no limit)
+    'end_when_all_guessed': True, # End the round early once every guesser has it
+    'guess_points': 10,         # Points for a correct guess...
+    'speed_bonus': 5,           # ... plus up to this much for guessing early
+    'guess_decay': 0.75,        # Each later correct guesser gets this fraction of the previous one's points
+    'drawer_points': 0,         # Points for the drawer per correct guess
+}
+FRACTIONAL_RULES = ('round_time', 'intermission', 'guess_decay') # May be given as int or float
+
+
+def load_rules(profile=DEFAULT_PROFILE, path=RULES_FILE):
+    """Returns the rules of a profile in the rules file. Raises ValueError for an unknown profile or rule."""
+    profiles = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            profiles = json.load(f)
+    if not isinstance(profiles, dict) or not all(isinstance(rules, dict) for rules in profiles.values()):
+        raise ValueError(f"{path} must be a JSON object mapping profile names to objects of rules")
+    if profile not in profiles and profile != DEFAULT_PROFILE:
+        raise ValueError(f"Unknown rule profile '{profile}'. Available: {', '.join(sorted(profiles)) or 'none'}")
+
+    rules = dict(DEFAULT_RULES)
+    for name, value in profiles.get(profile, {}).items():
+        if name not in DEFAULT_RULES:
+            raise ValueError(f"Unknown rule '{name}' in profile '{profile}'")
+        rules[name] = check_rule(profile, name, value)
+    if rules['min_players'] < 2 or rules['round_time'] <= 0 or rules['rounds_per_player'] < 1:
+        raise ValueError(f"Profile '{profile}' needs min_players >= 2, round_time > 0 and rounds_per_player >= 1")
+    return rules
+
+
+def check_rule(profile, name, value):
+    """Returns `value` if it has the type of the rule's default and is finite and not negative. Raises ValueError otherwise."""
+    if isinstance(DEFAULT_RULES[name], bool):
+        valid, expected = isinstance(value, bool), "true or false"
+    elif name in FRACTIONAL_RULES:
+        valid, expected = isinstance(value, (int, float)) and not isinstance(value, bool), "a number"
+    else:
+        valid, expected = isinstance(value, int) and not isinstance(value, bool), "a whole number"
+    if not valid:
+        raise ValueError(f"Rule '{name}' in profile '{profile}' must be {expected}, not {json.dumps(value)}")
+    if isinstance(value, bool):
+        return value
+    try:
+        finite = math.isfinite(value) # json.load accepts Infinity and NaN
+    except OverflowError: # An integer too large for a float
+        finite = False
+    if not finite:
+        raise ValueError(f"Rule '{name}' in profile '{profile}' must be a finite number, not {json.dumps(value)}")
+    if value < 0:
+        raise ValueError(f"Rule '{name}' in profile '{profile}' must not be negative")
+    if name == 'guess_decay' and value > 1:
+        raise ValueError(f"Rule 'guess_decay' in profile '{profile}' must be between 0 and 1, so later guessers get fewer points")
+    return value
+
+
+def guess_points(rules, position, time_left):
+    """Points for the correct guess at `position` (0 for the first guesser) with `time_left` seconds to go."""
+    points = rules['guess_points'] + rules['speed_bonus'] * (time_left / rules['round_time'])
+    return int(points * rules['guess_decay'] ** position)
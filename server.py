@@ -3,12 +3,28 @@ import threading
 import json
 import random
 import time
+import argparse
+from collections import deque
+from protocol import encode_message, compress_frame, COMPRESSION_CODEC
+import hooks
+from rules import load_rules, guess_points, RULES_FILE, DEFAULT_PROFILE, DEFAULT_RULES
 
 HOST = '0.0.0.0'  # Standard loopback interface address (localhost)
 PORT = 5555       # Port to listen on (non-privileged ports are > 1023)
 
 # Game State
 clients = {}  # {client_socket: (username, address)}
+compressed_clients = set()  # client sockets that negotiated compression at 'join'
+client_outboxes = {}  # {client_socket: outbox} per-player send queues, drained by one writer thread each
+spectators = {}  # {client_socket: (username, address)} - read-only viewers, never part of the game
+spectator_outbox = []  # (message_type, data, encoded_frame, meta) waiting for the spectator fan-out
+pending_spectators = {}  # {client_socket: joining spectator} until the fan-out adds them to spectators
+spectator_lock = threading.Lock()
+latency_stats = {
+    'samples_ms': deque(maxlen=5000), # Recent drawer-to-canvas stroke delays reported by clients
+    'missing_segments': 0,            # Stamped segments that never reached a client's canvas
+    'reports': 0,
+}
 game_state = {
     'status': 'waiting',  # 'waiting', 'playing', 'round_end', 'game_over'
     'drawer': None,       # username of the current drawer
@@ -19,8 +35,8 @@ game_state = {
     'players_ready': 0,   # count of players who clicked "Ready"
     'current_round': 0,
     'max_rounds': 0,      # Will be set dynamically based on player count
-    'round_timer': 90,    # 1.5 minutes per round (90 seconds)
     'round_start_time': 0,
+    'correct_guessers': [], # usernames who guessed the word this round, in order
     'player_order': [],   # To manage drawer rotation
     'current_drawer_index': -1
 }
@@ -37,33 +53,153 @@ WORDS = [
     "hat", "igloo", "jungle", "koala", "ladder", "mirror", "needle", "onion", "paint", "quilt", "river",
     "sandwich", "teapot", "vampire", "whale", "x-ray", "yogurt", "zeppelin"
 ]
-MIN_PLAYERS = 2 # Minimum players to start the game
-
-def broadcast(message_type, data, exclude_socket=None):
+game_rules = dict(DEFAULT_RULES) # Round length, scoring etc. of the rule profile the server was started with
+SPECTATOR_FLUSH_INTERVAL = 0.25 # Seconds between batched sends to spectators
+SPECTATOR_MAX_SEGMENTS = 200    # Drawing segments per batch before spectators get a downsampled stroke
+SPECTATOR_BACKLOG_LIMIT = 40    # Batches waiting for a spectator (10 s worth) before they are dropped
+BACKLOG_DEGRADE = 0.3       # Seconds the oldest queued message has waited before a player's drawing stream is degraded
+BACKLOG_RECOVER = 0.05      # ... and back to full quality once messages wait no longer than this
+SNAPSHOT_SEGMENTS = 400     # Pending segments for a degraded player before a compacted snapshot is sent instead
+BACKLOG_LIMIT = 20000       # Messages waiting for a player before they are considered gone
+SEND_NOW_FLAGS = getattr(socket, 'MSG_DONTWAIT', 0) # Non-blocking send() for players who keep up (not on Windows)
+
+def broadcast(message_type, data, exclude_socket=None, meta=None):
     """Sends a message to all connected clients."""
-    full_message = json.dumps({'type': message_type, 'data': data}) + '\n'
+    full_message = encode_message(message_type, data, meta)
+    compressed_message = None
     for client_socket in list(clients.keys()): # Use list() to avoid RuntimeError: dictionary changed size during iteration
         if client_socket != exclude_socket:
-            try:
-                client_socket.sendall(full_message.encode('utf-8'))
-            except Exception as e:
-                print(f"Error broadcasting to {clients.get(client_socket, ('unknown', ''))[0]}: {e}")
-                remove_client(client_socket)
+            payload = full_message
+            if client_socket in compressed_clients:
+                if compressed_message is None: # Compress once, only if someone can use it
+                    compressed_message = compress_frame(full_message) or full_message
+                payload = compressed_message
+            queue_for_client(client_socket, message_type, data, payload, meta)
+    if spectators or pending_spectators:
+        queue_for_spectators(message_type, data, full_message, meta)
 
 def send_to_client(client_socket, message_type, data):
     """Sends a specific message to a single client."""
-    full_message = json.dumps({'type': message_type, 'data': data}) + '\n'
-    try:
-        client_socket.sendall(full_message.encode('utf-8'))
+    full_message = encode_message(message_type, data)
+    if client_socket in compressed_clients:
+        full_message = compress_frame(full_message) or full_message
+    if client_socket in client_outboxes:
+        queue_for_client(client_socket, message_type, data, full_message)
+        return
+    try: # No send queue, e.g. a rejected join
+        client_socket.sendall(full_message)
     except Exception as e:
         print(f"Error sending to {clients.get(client_socket, ('unknown', ''))[0]}: {e}")
         remove_client(client_socket)
 
+# --- Per-Player Send Queues ---
+# broadcast() never blocks on a player's socket: a player who is keeping up gets the frame with
+# a non-blocking send right away, otherwise it is queued for that player's writer thread. A player whose messages wait too long in the queue (a slow link) gets a degraded drawing stream:
+# queued segments are merged and downsampled, or replaced by a compacted snapshot of the canvas,
+# until the queue has drained again. Other players are not slowed down either way.
+def open_outbox(client_socket, limit=BACKLOG_LIMIT, adaptive=True):
+    """Creates a player's (or spectator's) send queue and starts the writer thread that drains it.
+
+    Over `limit` queued messages the connection is dropped. Spectators get pre-batched frames, so
+    their outbox is not `adaptive` (never degraded).
+    """
+    lock = threading.Lock()
+    outbox = {
+        'messages': deque(),  # (message_type, data, payload, meta)
+        'oldest': 0.0,        # When the oldest queued message was queued
+        'lock': lock,         # Held directly on the hot path; cheaper to enter than the Condition
+        'ready': threading.Condition(lock),
+        'open': True,
+        'sending': False,     # The writer thread is in sendall()
+        'degraded': False,
+        'limit': limit,
+        'adaptive': adaptive,
+    }
+    client_outboxes[client_socket] = outbox
+    threading.Thread(target=client_writer_loop, args=(client_socket, outbox), daemon=True).start()
+
+def close_outbox(client_socket):
+    outbox = client_outboxes.pop(client_socket, None)
+    if outbox:
+        with outbox['ready']:
+            outbox['open'] = False
+            outbox['ready'].notify()
+
+def queue_for_client(client_socket, message_type, data, payload, meta=None):
+    outbox = client_outboxes.get(client_socket)
+    if outbox is None:
+        return
+    with outbox['lock']:
+        if SEND_NOW_FLAGS and not outbox['messages'] and not outbox['sending'] and not outbox['degraded']:
+            try: # Nothing is waiting, so the frame can skip the queue (and the writer thread wake-up)
+                sent = client_socket.send(payload, SEND_NOW_FLAGS)
+            except OSError: # Full socket buffer or a broken connection: leave it to the writer
+                sent = 0
+            if sent == len(payload):
+                return
+            if sent:
+                message_type, data, payload, meta = 'partial_frame', None, payload[sent:], None # Sent as is
+        if not outbox['messages']:
+            outbox['oldest'] = time.time()
+        outbox['messages'].append((message_type, data, payload, meta))
+        backlog = len(outbox['messages'])
+        outbox['ready'].notify()
+    if backlog > outbox['limit']:
+        print(f"{connection_name(client_socket)} is not receiving anything. Disconnecting.")
+        remove_connection(client_socket)
+
+def client_writer_loop(client_socket, outbox):
+    """Sends a player's queued messages, degrading the drawing stream while the player lags behind."""
+    while True:
+        with outbox['ready']:
+            while outbox['open'] and not outbox['messages']:
+                outbox['ready'].wait()
+            if not outbox['open']:
+                return
+            messages = list(outbox['messages'])
+            outbox['messages'].clear()
+            outbox['sending'] = True
+            waited = time.time() - outbox['oldest']
+
+        username = connection_name(client_socket)
+        if outbox['adaptive'] and not outbox['degraded'] and waited >= BACKLOG_DEGRADE:
+            outbox['degraded'] = True
+            print(f"{username} is falling behind ({len(messages)} messages queued for {waited:.1f}s). Degrading their drawing stream.")
+        elif outbox['degraded'] and waited <= BACKLOG_RECOVER:
+            outbox['degraded'] = False
+            print(f"{username} caught up. Back to the full drawing stream.")
+
+        if outbox['degraded']:
+            frames = compact_messages(messages, snapshot=True, compress=client_socket in compressed_clients)
+        else:
+            frames = [payload for _, _, payload, _ in messages]
+        try:
+            client_socket.sendall(b''.join(frames))
+        except Exception as e:
+            if outbox['open']: # Otherwise the connection was already removed and shut down
+                print(f"Error sending to {username}: {e}")
+                remove_connection(client_socket)
+            return
+        with outbox['ready']:
+            outbox['sending'] = False
+
+def connection_name(client_socket):
+    return (clients.get(client_socket) or spectators.get(client_socket) or ('unknown', ''))[0]
+
+def remove_connection(client_socket):
+    if client_socket in spectators:
+        remove_spectator(client_socket)
+    else:
+        remove_client(client_socket)
+
 def remove_client(client_socket):
     """Removes a disconnected client."""
     if client_socket in clients:
         username, addr = clients.pop(client_socket)
+        compressed_clients.discard(client_socket)
+        close_outbox(client_socket)
         print(f"Client {username} disconnected.")
+        hooks.emit('leave', {'username': username, 'spectator': False})
         
         game_state['score'].pop(username, None)
         
@@ -78,17 +214,172 @@ def remove_client(client_socket):
         if game_state['drawer'] == username and game_state['status'] == 'playing':
             print(f"{username} (the drawer) left. Ending round.")
             end_round()
+        elif game_state['status'] == 'playing' and game_state['correct_guessers'] and round_complete():
+            end_round() # Everyone still here has guessed the word
         
-        if game_state['status'] != 'waiting' and len(clients) < MIN_PLAYERS:
+        if game_state['status'] != 'waiting' and len(clients) < game_rules['min_players']:
             print("Not enough players to continue. Ending game.")
             broadcast('notification', {'message': "Not enough players to continue. Game Over!"})
             end_game()
 
+    try:
+        client_socket.shutdown(socket.SHUT_RDWR) # close() alone does not wake a writer thread blocked in sendall()
+    except OSError:
+        pass
     try:
         client_socket.close()
     except Exception as e:
         print(f"Error closing socket for disconnected client: {e}")
 
+def remove_spectator(client_socket):
+    """Removes a disconnected spectator. Spectators never affect the game, so nothing is broadcast."""
+    with spectator_lock:
+        pending = pending_spectators.pop(client_socket, None)
+    if client_socket in spectators or pending:
+        username, addr = spectators.pop(client_socket, None) or pending['name']
+        compressed_clients.discard(client_socket)
+        close_outbox(client_socket)
+        print(f"Spectator {username} disconnected.")
+        hooks.emit('leave', {'username': username, 'spectator': True})
+    try:
+        client_socket.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    try:
+        client_socket.close()
+    except Exception as e:
+        print(f"Error closing socket for disconnected spectator: {e}")
+
+# --- Spectator Fan-out ---
+# Players get every message immediately. Spectators are served by a separate, lower-priority
+# thread that batches whatever was broadcast in the last SPECTATOR_FLUSH_INTERVAL, so hundreds
+# of viewers never slow down the game loop. Each batch goes through the spectator's own send
+# queue, so a viewer who stops reading only fills their own queue until they are dropped.
+def add_spectator(client_socket, username, addr):
+    """Sends a joining spectator the current state and lines them up for the next fan-out.
+
+    The snapshot is taken under spectator_lock, so the position in spectator_outbox at that moment
+    separates events the snapshot already contains from those the spectator still has to receive.
+    """
+    open_outbox(client_socket, limit=SPECTATOR_BACKLOG_LIMIT, adaptive=False)
+    with spectator_lock:
+        frame = encode_message('current_state', build_current_state(username))
+        pending = {'name': (username, addr), 'mark': len(spectator_outbox), 'messages': [], 'ready': False}
+        pending_spectators[client_socket] = pending
+    if client_socket in compressed_clients: # Outside the lock, so broadcasts don't wait for it
+        frame = compress_frame(frame) or frame
+    queue_for_client(client_socket, 'current_state', None, frame)
+    with spectator_lock:
+        pending['ready'] = True # Batches may follow the snapshot now
+
+def queue_for_spectators(message_type, data, full_message=None, meta=None):
+    """Queues a message for the next spectator batch. Cheap enough to call from the hot path."""
+    with spectator_lock:
+        spectator_outbox.append((message_type, data, full_message, meta))
+
+def downsample_segments(segments):
+    """Roughly halves the number of segments by joining pairs that belong to the same stroke."""
+    merged = []
+    i = 0
+    while i < len(segments):
+        segment = segments[i]
+        if i + 1 < len(segments):
+            following = segments[i + 1]
+            if len(segment) == 6 and len(following) == 6 and \
+                    (segment[2], segment[3], segment[4], segment[5]) == (following[0], following[1], following[4], following[5]):
+                merged.append([segment[0], segment[1], following[2], following[3], segment[4], segment[5]])
+                i += 2
+                continue
+        merged.append(segment)
+        i += 1
+    return merged
+
+def compact_messages(messages, snapshot=False, compress=False):
+    """Turns queued broadcasts into fewer frames for a spectator or a lagging player.
+
+    All 'drawing_update' segments are merged into one 'drawing_batch' (downsampled if long) sent
+    after the other messages, segments wiped by a canvas reset are dropped, and 'timer_update' /
+    'player_list_update' only keep their latest value. With `snapshot`, many pending segments are
+    replaced by one 'full_drawing_update' of the current canvas. With `compress`, the frames built
+    here are compressed like any other (queued frames are sent as they are).
+
+    If the replaced segments carried telemetry, the frame that replaces them gets the newest 'seq'
+    and 'ts' plus 'first_seq', so clients neither lose latency samples nor count merged segments as missing.
+    """
+    def encode(message_type, data, meta=None):
+        frame = encode_message(message_type, data, meta)
+        return (compress_frame(frame) or frame) if compress else frame
+
+    latest = {}
+    for index, (message_type, _, _, _) in enumerate(messages):
+        if message_type in ('timer_update', 'player_list_update'):
+            latest[message_type] = index
+
+    frames = []
+    segments = []
+    stamped = None # Telemetry of the replaced segments: newest 'seq' / 'ts', and 'first_seq'
+    for index, (message_type, data, full_message, meta) in enumerate(messages):
+        if message_type == 'drawing_update':
+            segments.append(data)
+            if meta and 'ts' in meta:
+                if stamped is None:
+                    stamped = dict(meta, first_seq=meta.get('seq'))
+                else:
+                    stamped.update(meta)
+            continue
+        if message_type in latest and latest[message_type] != index:
+            continue
+        if message_type in ('clear_canvas_event', 'full_drawing_update', 'new_round', 'round_end', 'game_over'):
+            segments.clear() # The canvas is reset by these anyway
+            if message_type == 'new_round':
+                stamped = None # Clients restart the sequence with the new drawer
+        frames.append(full_message or encode(message_type, data))
+
+    if snapshot and len(segments) > SNAPSHOT_SEGMENTS and game_state['status'] == 'playing':
+        # Nothing after these segments reset the canvas, so the current drawing already contains them
+        frames.append(encode('full_drawing_update', {'drawing_data': list(game_state['drawing_data'])}, stamped))
+    elif segments or stamped: # An empty batch still tells the client which stamped segments were wiped, not lost
+        while len(segments) > SPECTATOR_MAX_SEGMENTS:
+            shorter = downsample_segments(segments)
+            if len(shorter) == len(segments): # Nothing left to join (e.g. many tiny strokes)
+                break
+            segments = shorter
+        frames.append(encode('drawing_batch', {'drawing_data': segments}, stamped))
+    return frames
+
+def spectator_fanout_loop():
+    """Periodically sends the batched game events to every spectator."""
+    while True:
+        time.sleep(SPECTATOR_FLUSH_INTERVAL)
+        with spectator_lock:
+            outbox = spectator_outbox[:]
+            spectator_outbox.clear()
+            joined = {}
+            for spectator_socket, pending in list(pending_spectators.items()):
+                # Only what was queued after their snapshot; the rest is in it already
+                pending['messages'].extend(outbox[pending.pop('mark', 0):])
+                if pending['ready']:
+                    joined[spectator_socket] = pending_spectators.pop(spectator_socket)
+
+        if outbox and spectators:
+            frames = compact_messages(outbox)
+            full_message = b''.join(frames)
+            compressed_message = None
+            for spectator_socket in list(spectators.keys()):
+                payload = full_message
+                if spectator_socket in compressed_clients:
+                    if compressed_message is None:
+                        compressed_message = b''.join(compress_frame(frame) or frame for frame in frames)
+                    payload = compressed_message
+                queue_for_client(spectator_socket, 'spectator_batch', None, payload)
+
+        for spectator_socket, pending in joined.items():
+            if pending['messages']:
+                compress = spectator_socket in compressed_clients
+                queue_for_client(spectator_socket, 'spectator_batch', None,
+                                 b''.join(compact_messages(pending['messages'], compress=compress)))
+            spectators[spectator_socket] = pending['name']
+
 
 def start_new_round():
     """Initializes a new drawing round."""
@@ -97,7 +388,7 @@ def start_new_round():
     
     player_usernames = list(game_state['score'].keys())
 
-    if len(player_usernames) < MIN_PLAYERS:
+    if len(player_usernames) < game_rules['min_players']:
         broadcast('notification', {'message': "Not enough players to start a new round. Game Over!"})
         end_game()
         return
@@ -116,9 +407,16 @@ def start_new_round():
     game_state['word'] = random.choice(WORDS)
     game_state['drawing_data'].clear()
     game_state['guesses'].clear()
+    game_state['correct_guessers'].clear()
     game_state['round_start_time'] = time.time()
 
     print(f"--- Round {game_state['current_round']}/{game_state['max_rounds']} | Drawer: {game_state['drawer']}, Word: {game_state['word']} ---")
+    hooks.emit('round_start', {
+        'current_round': game_state['current_round'],
+        'max_rounds': game_state['max_rounds'],
+        'drawer': game_state['drawer'],
+        'word': game_state['word'],
+    })
 
     for sock, (username, _) in clients.items():
         is_drawer = (username == game_state['drawer'])
@@ -129,22 +427,45 @@ def start_new_round():
             'current_round': game_state['current_round'],
             'max_rounds': game_state['max_rounds'],
         })
+    if spectators or pending_spectators:
+        queue_for_spectators('new_round', {
+            'drawer': game_state['drawer'],
+            'word': '????',
+            'word_length': len(game_state['word']),
+            'current_round': game_state['current_round'],
+            'max_rounds': game_state['max_rounds'],
+        })
     broadcast('notification', {'message': f"Round {game_state['current_round']}! {game_state['drawer']} is drawing."})
 
-def end_round(guesser_username=None):
+def end_round():
     """Ends the current drawing round."""
     game_state['status'] = 'round_end'
+    guessers = list(game_state['correct_guessers'])
     message = f"Round over! The word was '{game_state['word']}'."
-    if guesser_username:
-        message += f" {guesser_username} guessed correctly!"
+    if guessers:
+        message += f" {', '.join(guessers)} guessed correctly!"
     
     broadcast('round_end', {
         'message': message,
         'correct_word': game_state['word'],
         'current_scores': game_state['score']
     })
+    hooks.emit('round_end', {
+        'current_round': game_state['current_round'],
+        'drawer': game_state['drawer'],
+        'word': game_state['word'],
+        'guesser': guessers[0] if guessers else None,
+        'guessers': guessers,
+        'scores': dict(game_state['score']),
+    })
 
-    threading.Timer(5.0, start_new_round_or_end_game).start()
+    latency = stroke_latency_summary()
+    if latency:
+        print(f"Stroke latency over last {latency['count']} segments: p50 {latency['p50_ms']:.1f} ms, "
+              f"p95 {latency['p95_ms']:.1f} ms, p99 {latency['p99_ms']:.1f} ms, max {latency['max_ms']:.1f} ms, "
+              f"{latency['missing_segments']} missing")
+
+    threading.Timer(game_rules['intermission'], start_new_round_or_end_game).start()
 
 def start_new_round_or_end_game():
     if game_state['current_round'] >= game_state['max_rounds']:
@@ -170,6 +491,7 @@ def end_game():
     })
     
     print(f"Game Over. Final Scores: {game_state['score']}")
+    hooks.emit('game_end', {'winner': winner, 'scores': dict(game_state['score'])})
     # Reset for a new game
     game_state.update({
         'status': 'waiting',
@@ -179,17 +501,92 @@ def end_game():
         'guesses': [],
         'players_ready': 0,
         'current_round': 0,
+        'correct_guessers': [],
         'player_order': [],
         'current_drawer_index': -1,
     })
     for user in game_state['score']:
         game_state['score'][user] = 0
 
+def build_current_state(username):
+    """Builds the snapshot sent to a client that joins mid-game."""
+    return {
+        'status': game_state['status'],
+        'drawer': game_state['drawer'],
+        'word': game_state['word'] if game_state['drawer'] == username else '????',
+        'word_length': len(game_state['word']) if game_state['status'] == 'playing' and game_state['drawer'] != username else None,
+        'drawing_data': game_state['drawing_data'],
+        'guesses': game_state['guesses'],
+        'score': game_state['score'],
+        'current_round': game_state['current_round'],
+        'max_rounds': game_state['max_rounds']
+    }
+
+def undo_last_stroke():
+    """Removes the drawer's last stroke and redraws everyone's canvas. Returns False if there was nothing to undo."""
+    if not game_state['drawing_data']:
+        return False
+    try:
+        if game_state['drawing_data'][-1] is None:
+            game_state['drawing_data'].pop()
+        
+        while game_state['drawing_data'] and game_state['drawing_data'][-1] is not None:
+            game_state['drawing_data'].pop()
+        
+        broadcast('full_drawing_update', {'drawing_data': game_state['drawing_data']})
+    except IndexError:
+        broadcast('full_drawing_update', {'drawing_data': []})
+    return True
+
+def check_guess(username, text):
+    """Scores a guess. Returns the points awarded (which may be 0), or None if the guess was wrong or the player already guessed the word."""
+    if text.lower() != game_state['word'].lower() or username in game_state['correct_guessers']:
+        return None
+    time_left = game_rules['round_time'] - (time.time() - game_state['round_start_time'])
+    points = guess_points(game_rules, len(game_state['correct_guessers']), time_left)
+    game_state['correct_guessers'].append(username)
+    game_state['score'][username] += points
+    if game_rules['drawer_points'] and game_state['drawer'] in game_state['score']:
+        game_state['score'][game_state['drawer']] += game_rules['drawer_points']
+    return points
+
+def round_complete():
+    """True once enough players guessed the word for the round to end before the timer runs out."""
+    guessed = game_state['correct_guessers']
+    if game_rules['guessers_per_round'] and len(guessed) >= game_rules['guessers_per_round']:
+        return True
+    if game_rules['end_when_all_guessed']:
+        guessers = [username for username in game_state['score'] if username != game_state['drawer']]
+        return all(username in guessed for username in guessers)
+    return False
+
+def record_latency_report(report):
+    """Adds a client's stroke latency samples to the server stats."""
+    latency_stats['samples_ms'].extend(float(sample) for sample in report.get('samples_ms', []))
+    latency_stats['missing_segments'] += int(report.get('missing_segments', 0))
+    latency_stats['reports'] += 1
+
+def stroke_latency_summary():
+    """Percentiles of the recently reported stroke latencies, or None if nobody reported any."""
+    samples = sorted(latency_stats['samples_ms'])
+    if not samples:
+        return None
+    def percentile(fraction):
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+    return {
+        'count': len(samples),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': samples[-1],
+        'missing_segments': latency_stats['missing_segments'],
+    }
+
 def game_timer_tick():
     """Handles the round timer."""
     if game_state['status'] == 'playing':
         elapsed = time.time() - game_state['round_start_time']
-        remaining = max(0, game_state['round_timer'] - elapsed)
+        remaining = max(0, game_rules['round_time'] - elapsed)
         broadcast('timer_update', {'time_left': int(remaining)})
 
         if remaining == 0:
@@ -201,6 +598,7 @@ def handle_client(conn, addr):
     """Handles incoming messages from a single client."""
     print(f"New connection from {addr}")
     username = None
+    is_spectator = False
     buffer = ""
     try:
         # First message must be 'join'
@@ -214,38 +612,34 @@ def handle_client(conn, addr):
             
             if msg['type'] == 'join':
                 username = msg['data']['username']
-                if username in [u for u, _ in clients.values()]:
+                is_spectator = bool(msg['data'].get('spectator', False))
+                taken = [u for u, _ in clients.values()] + [u for u, _ in spectators.values()] + \
+                        [pending['name'][0] for pending in list(pending_spectators.values())]
+                if username in taken:
                     send_to_client(conn, 'error', {'message': "Username already taken."})
                     return
                 
-                clients[conn] = (username, addr)
-                game_state['score'][username] = 0
-                
-                broadcast('notification', {'message': f"{username} has joined the game!"})
-                broadcast('player_list_update', {'scores': game_state['score']})
-
-                send_to_client(conn, 'current_state', {
-                    'status': game_state['status'],
-                    'drawer': game_state['drawer'],
-                    'word': game_state['word'] if game_state['drawer'] == username else '????',
-                    'word_length': len(game_state['word']) if game_state['status'] == 'playing' and game_state['drawer'] != username else None,
-                    'drawing_data': game_state['drawing_data'],
-                    'guesses': game_state['guesses'],
-                    'score': game_state['score'],
-                    'current_round': game_state['current_round'],
-                    'max_rounds': game_state['max_rounds']
-                })
+                if COMPRESSION_CODEC in msg['data'].get('compression', []):
+                    compressed_clients.add(conn)
+                if is_spectator:
+                    add_spectator(conn, username, addr)
+                    print(f"{username} is spectating. ({len(spectators) + len(pending_spectators)} spectators)")
+                else:
+                    clients[conn] = (username, addr)
+                    open_outbox(conn)
+                    game_state['score'][username] = 0
+                    
+                    broadcast('notification', {'message': f"{username} has joined the game!"})
+                    broadcast('player_list_update', {'scores': game_state['score']})
+                    send_to_client(conn, 'current_state', build_current_state(username))
+                hooks.emit('join', {'username': username, 'spectator': is_spectator})
             else:
                 return
         else:
             return
 
-        # Main message loop
+        # Main message loop. Lines that arrived together with 'join' are already in the buffer.
         while True:
-            data = conn.recv(4096).decode('utf-8')
-            if not data: break
-            
-            buffer += data
             while '\n' in buffer:
                 line, buffer = buffer.split('\n', 1)
                 if not line: continue
@@ -253,12 +647,16 @@ def handle_client(conn, addr):
                 msg = json.loads(line)
                 msg_type = msg.get('type')
                 msg_data = msg.get('data')
+                if is_spectator and msg_type not in ('ping', 'latency_report'):
+                    continue # Spectators are read-only; telemetry doesn't touch the game
 
                 is_drawer = (username == game_state['drawer'])
                 
                 if msg_type == 'drawing_point' and is_drawer:
                     game_state['drawing_data'].append(msg_data)
-                    broadcast('drawing_update', msg_data, exclude_socket=conn)
+                    broadcast('drawing_update', msg_data, exclude_socket=conn, meta=msg.get('meta'))
+                    if 'drawing' in hooks.handlers: # Skip building the event on the hot path when nobody listens
+                        hooks.emit('drawing', {'drawer': username, 'segment': msg_data, 'time': time.time()})
 
                 elif msg_type == 'end_stroke' and is_drawer:
                     game_state['drawing_data'].append(None)
@@ -268,18 +666,7 @@ def handle_client(conn, addr):
                     broadcast('clear_canvas_event', {})
 
                 elif msg_type == 'undo_last_draw' and is_drawer:
-                    if game_state['drawing_data']:
-                        try:
-                            if game_state['drawing_data'][-1] is None:
-                                game_state['drawing_data'].pop()
-                            
-                            while game_state['drawing_data'] and game_state['drawing_data'][-1] is not None:
-                                game_state['drawing_data'].pop()
-                            
-                            broadcast('full_drawing_update', {'drawing_data': game_state['drawing_data']})
-                        except IndexError:
-                            broadcast('full_drawing_update', {'drawing_data': []})
-                    else:
+                    if not undo_last_stroke():
                         send_to_client(conn, 'notification', {'message': "Nothing to undo."})
 
                 elif msg_type == 'chat_input':
@@ -290,29 +677,52 @@ def handle_client(conn, addr):
                         if is_drawer:
                             game_state['guesses'].append((f"HINT from {username}", text))
                             broadcast('guess_hint_message', {'username': f"HINT from {username}", 'message': text})
+                        elif username in game_state['correct_guessers']:
+                            # Could give the word away, so only the drawer and other correct guessers see it
+                            for sock, (name, _) in list(clients.items()):
+                                if name == game_state['drawer'] or name in game_state['correct_guessers']:
+                                    send_to_client(sock, 'guess_hint_message', {'username': username, 'message': text})
                         else: # It's a guess
-                            game_state['guesses'].append((username, text))
-                            broadcast('guess_hint_message', {'username': username, 'message': text})
-                            if text.lower() == game_state['word'].lower():
-                                time_left = game_state['round_timer'] - (time.time() - game_state['round_start_time'])
-                                points = 10 + int(5 * (time_left / game_state['round_timer']))
-                                game_state['score'][username] += points
-                                # --- MODIFICATION: The following line has been removed ---
-                                # game_state['score'][game_state['drawer']] += 5 
-                                end_round(guesser_username=username)
+                            points = check_guess(username, text)
+                            if points is None or game_rules['guessers_per_round'] == 1:
+                                # A lone correct guess ends the round right away, so it is shown like any other
+                                game_state['guesses'].append((username, text))
+                                broadcast('guess_hint_message', {'username': username, 'message': text})
+                            if points is not None: # Late guessers may score nothing, but they still got the word
+                                if game_rules['guessers_per_round'] != 1:
+                                    broadcast('notification', {'message': f"{username} guessed the word! (+{points})"})
+                                    broadcast('player_list_update', {'scores': game_state['score']})
+                                hooks.emit('correct_guess', {
+                                    'username': username,
+                                    'word': game_state['word'],
+                                    'points': points,
+                                    'seconds': time.time() - game_state['round_start_time'],
+                                })
+                                if round_complete():
+                                    end_round()
                     else: # General chat
                         broadcast('chat_message', {'username': username, 'message': text})
 
+                elif msg_type == 'ping': # Lets clients estimate their clock offset to the server
+                    send_to_client(conn, 'pong', {'t0': msg_data.get('t0'), 't1': time.time()})
+
+                elif msg_type == 'latency_report':
+                    record_latency_report(msg_data)
+
                 elif msg_type == 'ready':
                     if game_state['status'] in ['waiting', 'game_over']:
                         game_state['players_ready'] += 1
                         broadcast('notification', {'message': f"{username} is ready! ({game_state['players_ready']}/{len(clients)} ready)"})
                         
-                        if len(clients) >= MIN_PLAYERS and game_state['players_ready'] == len(clients):
-                            game_state['max_rounds'] = len(clients) * 3 
+                        if len(clients) >= game_rules['min_players'] and game_state['players_ready'] == len(clients):
+                            game_state['max_rounds'] = len(clients) * game_rules['rounds_per_player']
                             game_state['players_ready'] = 0 
                             start_new_round()
 
+            data = conn.recv(4096).decode('utf-8')
+            if not data: break
+            buffer += data
+
     except (ConnectionResetError, json.JSONDecodeError) as e:
         print(f"Connection error with {username or addr}: {e}")
     except Exception as e:
@@ -320,6 +730,8 @@ def handle_client(conn, addr):
     finally:
         if conn in clients:
             remove_client(conn)
+        elif conn in spectators or conn in pending_spectators:
+            remove_spectator(conn)
 
 
 def start_server():
@@ -330,6 +742,7 @@ def start_server():
         server_socket.listen()
         print(f"🎨 Scribble server listening on {HOST}:{PORT}")
         threading.Thread(target=game_timer_tick, daemon=True).start()
+        threading.Thread(target=spectator_fanout_loop, daemon=True).start()
 
         while True:
             conn, addr = server_socket.accept()
@@ -342,4 +755,21 @@ def start_server():
         server_socket.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scribble server")
+    parser.add_argument('--rules', default=DEFAULT_PROFILE, help=f"rule profile to play with (default: {DEFAULT_PROFILE})")
+    parser.add_argument('--rules-file', default=RULES_FILE, help="JSON file with the rule profiles (default: rules.json)")
+    parser.add_argument('--plugin', action='append', default=[], metavar='MODULE',
+                        help="import a plugin module that registers game event hooks (repeatable)")
+    args = parser.parse_args()
+    try:
+        game_rules.update(load_rules(args.rules, args.rules_file))
+    except (OSError, ValueError) as e:
+        print(f"Failed to load rules: {e}")
+        raise SystemExit(1)
+    try:
+        hooks.load_plugins(args.plugin)
+    except Exception as e:
+        print(f"Failed to load plugin: {e}")
+        raise SystemExit(1)
+    print(f"Rules: {args.rules} ({game_rules['round_time']}s rounds, {game_rules['rounds_per_player']} per player)")
     start_server()
\ No newline at end of file